@@ -1,15 +1,23 @@
 import os
 import time
+import math
+import hmac
 import hashlib
-import secrets
-import json
+import queue
+import atexit
 import asyncio
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import logging
+import logging.handlers
+from binascii import hexlify, unhexlify
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
 
 import httpx
-from fastapi import FastAPI, HTTPException, Depends, Header, Request, BackgroundTasks
-from fastapi.responses import JSONResponse
+import orjson
+from cachetools import LRUCache, TLRUCache
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -17,11 +25,73 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Logging - handlers only enqueue records; a listener thread does the stream I/O
+# so a slow stdout never blocks the event loop
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(_log_queue, _log_handler, respect_handler_level=True)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# Records are enqueued unformatted beyond the message; the stream handler formats them
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), handlers=[_queue_handler])
+log_listener.start()
+# Flush queued records before the worker exits
+atexit.register(log_listener.stop)
+logger = logging.getLogger("mt5api")
+# httpx logs every request at INFO - keep that out of the hot path
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Set up shared clients on startup and release them on shutdown"""
+    logger.info("MT5 WebAPI Service starting...")
+    # One MT5 connection pool for the whole process lifetime. Handshakes run on
+    # a second client over the same pool, so they get their own cookie jar and
+    # a refresh never disturbs the session live requests are using
+    transport = create_http_transport()
+    app.state.http = create_http_client(transport)
+    session_manager.client = app.state.http
+    session_manager.auth_client = create_http_client(transport)
+    app.state.redis = await connect_redis()
+    logger.info("MT5 Server: %s", MT5_SERVER)
+    logger.info("MT5 Login: %s", MT5_LOGIN)
+    logger.info("Redis: %s", 'Connected' if app.state.redis else 'Not available - using in-memory cache')
+
+    # Try initial authentication
+    try:
+        success = await session_manager.authenticate()
+        if success:
+            logger.info("✅ Initial MT5 authentication successful")
+            # Test the connection
+            test_data = await session_manager.execute_request("user/get", {"login": "46108"})
+            logger.info("✅ Test API call successful: User 46108 found")
+        else:
+            logger.warning("❌ Initial authentication failed (will retry on first request)")
+    except Exception as e:
+        logger.warning("❌ Startup authentication failed: %s", e)
+        logger.warning("Will retry on first request...")
+
+    # Keep the session fresh in the background
+    session_manager.start_refresher()
+
+    yield
+
+    logger.info("Shutting down MT5 WebAPI Service...")
+    await session_manager.close()
+    # Also closes the pool shared with session_manager.auth_client
+    await app.state.http.aclose()
+    if app.state.redis:
+        await app.state.redis.aclose()
+        app.state.redis = None
+
 # FastAPI app
 app = FastAPI(
     title="MT5 WebAPI Service",
     version="1.0.0",
-    description="Production-ready MT5 WebAPI integration service"
+    description="Production-ready MT5 WebAPI integration service",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -33,55 +103,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Set in lifespan() when Redis is configured and reachable
+app.state.redis = None
+
 # Configuration - Environment variables are REQUIRED in production
 MT5_SERVER = os.getenv('MT5_SERVER')
 MT5_LOGIN = os.getenv('MT5_LOGIN')
 MT5_PASSWORD = os.getenv('MT5_PASSWORD')
 MT5_AGENT = os.getenv('MT5_AGENT', 'WebManager')
 MT5_VERSION = int(os.getenv('MT5_VERSION', '1290'))
+MT5_HTTP2 = os.getenv('MT5_HTTP2', 'true').lower() in ('1', 'true', 'yes')
 API_KEY = os.getenv('API_KEY')
 
 # Validate required environment variables
 if not all([MT5_SERVER, MT5_LOGIN, MT5_PASSWORD, API_KEY]):
-    print("⚠️ WARNING: Missing required environment variables!")
-    print("Using development defaults - DO NOT use in production!")
+    logger.warning("⚠️ Missing required environment variables!")
+    logger.warning("Using development defaults - DO NOT use in production!")
     # Development defaults (remove these in production)
     MT5_SERVER = MT5_SERVER or 'https://92.204.169.182:443'
     MT5_LOGIN = MT5_LOGIN or '47325'
     MT5_PASSWORD = MT5_PASSWORD or 'ApiDubai@2025'
     API_KEY = API_KEY or 'development-key-change-this'
 
-# Redis is optional - will use in-memory cache if not available
+# MT5 endpoint URLs are fixed - build them once instead of per request.
+# They are relative to the shared client's base_url (MT5_API_BASE).
+MT5_SERVER = MT5_SERVER.rstrip('/')
+MT5_API_BASE = MT5_SERVER + "/api/"
+AUTH_START_URL = "auth/start"
+AUTH_ANSWER_URL = "auth/answer"
+TEST_ACCESS_URL = "test/access"
+USER_UPDATE_URL = "user/update"
+USER_ADD_URL = "user/add"
+
+# MT5 password hash is static - compute it once instead of on every auth
+# MD5( MD5(password in UTF-16LE) + "WebAPI" )
+# MD5 is mandated by the MT5 auth protocol, not used as a security primitive
+# here, so usedforsecurity=False keeps OpenSSL on its fast path (and FIPS happy)
+_PWD_MD5 = hashlib.md5(MT5_PASSWORD.encode('utf-16le'), usedforsecurity=False).digest()
+_PASSWORD_HASH = hashlib.md5(_PWD_MD5 + b'WebAPI', usedforsecurity=False).digest()
+
+# Redis is optional - will use in-memory cache if not available.
+# The client lives on app.state.redis, created in lifespan() by connect_redis().
 REDIS_URL = os.getenv('REDIS_URL', '')
-REDIS_AVAILABLE = False
-redis_client = None
 
-# Try to import and connect to Redis if URL is provided
-if REDIS_URL:
+async def connect_redis():
+    """Connect to Redis if a Redis URL is provided, None means in-memory cache"""
+    if not REDIS_URL:
+        logger.info("No Redis URL provided, using in-memory cache")
+        return None
+
     try:
-        import redis
-        redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-        redis_client.ping()
-        REDIS_AVAILABLE = True
-        print("Redis connected successfully")
+        # hiredis parser is picked up automatically when installed
+        import redis.asyncio as aioredis
     except ImportError:
-        print("Redis library not installed, using in-memory cache")
+        logger.warning("Redis library not installed, using in-memory cache")
+        return None
+
+    redis = aioredis.from_url(
+        REDIS_URL,
+        decode_responses=False,
+        max_connections=20,
+        socket_timeout=2,
+        socket_connect_timeout=1
+    )
+    try:
+        await redis.ping()
     except Exception as e:
-        print(f"Redis connection failed, using in-memory cache: {e}")
-else:
-    print("No Redis URL provided, using in-memory cache")
+        logger.warning("Redis connection failed, using in-memory cache: %s", e)
+        await redis.aclose()
+        return None
+    logger.info("Redis connected successfully")
+    return redis
 
 # Request/Response models
 class ExecuteRequest(BaseModel):
     endpoint: str
     params: Dict[str, Any] = {}
 
-class UserResponse(BaseModel):
-    success: bool
-    data: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
-    cached: bool = False
-
 class CreateUserRequest(BaseModel):
     """Request model for creating a new user"""
     # Required fields
@@ -176,161 +274,479 @@ class UpdateUserRequest(BaseModel):
             }
         }
 
-# In-memory cache fallback
-memory_cache = {}
-
-def cache_set(key: str, value: str, expire: int = 300):
+# [second, formatted] - the timestamp only changes once a second
+_ts_cache = [0, ""]
+
+def now_iso() -> str:
+    """Current UTC time as an ISO 8601 string with second precision"""
+    t = int(time.time())
+    if t != _ts_cache[0]:
+        _ts_cache[:] = [t, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))]
+    return _ts_cache[1]
+
+# In-memory cache fallback - bounded LRUs, entries are (value, ttl) tuples and
+# expire individually so keys that are never read again don't pile up.
+# Each key namespace gets its own bucket so a burst of short-lived position
+# entries can't evict user data (and vice versa).
+def _memory_bucket(maxsize: int) -> TLRUCache:
+    return TLRUCache(maxsize=maxsize, ttu=lambda key, entry, now: now + entry[1])
+
+memory_caches = {
+    "user": _memory_bucket(5000),
+    "positions": _memory_bucket(5000),
+    "stale": _memory_bucket(5000),
+}
+memory_cache_default = _memory_bucket(1000)
+
+def ck(namespace: str, *parts: str) -> str:
+    """Cache key: the namespace (used for bucket routing) plus a short digest of the parts
+
+    Keeps keys small in Redis however long the group/symbol filters are.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update(part.encode())
+        h.update(b'\0')
+    return f"{namespace}:{h.hexdigest()}"
+
+def memory_cache_for(key: str) -> TLRUCache:
+    """Memory cache bucket for a key, by its namespace prefix"""
+    return memory_caches.get(key.partition(':')[0], memory_cache_default)
+
+async def cache_set(key: str, value: bytes, expire: int = 300):
     """Set cache with fallback to memory if Redis unavailable"""
-    if REDIS_AVAILABLE and redis_client:
-        redis_client.setex(key, expire, value)
+    redis = app.state.redis
+    if redis:
+        await redis.setex(key, expire, value)
     else:
-        memory_cache[key] = {
-            'value': value,
-            'expires': time.time() + expire
-        }
+        memory_cache_for(key)[key] = (value, expire)
 
-def cache_get(key: str) -> Optional[str]:
+async def cache_get(key: str) -> Optional[bytes]:
     """Get cache with fallback to memory if Redis unavailable"""
-    if REDIS_AVAILABLE and redis_client:
-        return redis_client.get(key)
+    redis = app.state.redis
+    if redis:
+        return await redis.get(key)
     else:
-        if key in memory_cache:
-            if memory_cache[key]['expires'] > time.time():
-                return memory_cache[key]['value']
-            else:
-                del memory_cache[key]
+        entry = memory_cache_for(key).get(key)
+        return entry[0] if entry else None
+
+# Stale copies outlive the real entry so we can still answer while MT5 errors
+STALE_PREFIX = "stale:"
+STALE_TTL = 600
+
+async def cache_delete(key: str):
+    """Drop a cached key along with its stale copy"""
+    stale_key = STALE_PREFIX + key
+    redis = app.state.redis
+    if redis:
+        await redis.delete(key, stale_key)
+    else:
+        memory_cache_for(key).pop(key, None)
+        memory_cache_for(stale_key).pop(stale_key, None)
+
+async def invalidate_user(login: Any):
+    """Drop every cached view of a user after it was changed on MT5"""
+    await cache_delete(ck("user", "details", str(login)))
+    await cache_delete(ck("user", "login", str(login)))
+
+async def cache_fill(key: str, value: bytes, expire: int):
+    """Cache a fresh upstream payload along with a long-lived stale copy"""
+    redis = app.state.redis
+    if redis:
+        # Both writes in one round trip
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.setex(key, expire, value)
+            pipe.setex(STALE_PREFIX + key, STALE_TTL, value)
+            await pipe.execute()
+    else:
+        await cache_set(key, value, expire)
+        await cache_set(STALE_PREFIX + key, value, STALE_TTL)
+
+async def cache_get_stale(key: str, error: Exception) -> Optional[bytes]:
+    """Last known good payload for key, if error is an upstream failure"""
+    # Client errors (unknown login, bad request) are real answers, not outages
+    if isinstance(error, HTTPException) and error.status_code < 500:
         return None
+    return await cache_get(STALE_PREFIX + key)
+
+class AdaptiveTTL:
+    """Per-key cache TTL driven by how often the key is actually requested
+
+    Keeps an EWMA of the inter-arrival time (and its variance) for each key
+    and sizes the TTL to cover the next request. Keys requested less often
+    than max_ttl get a short rare_ttl so they don't just occupy memory, and
+    keys whose payload didn't change since the last fetch get their TTL
+    extended, up to max_ttl.
+    """
+
+    def __init__(self, min_ttl: int, max_ttl: int, rare_ttl: int,
+                 factor: float = 2.0, alpha: float = 0.2, maxsize: int = 10_000):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.rare_ttl = rare_ttl
+        self.factor = factor
+        self.alpha = alpha
+        # key -> [last_seen, mean_gap, gap_variance, payload_hash, boost]
+        self.stats = LRUCache(maxsize=maxsize)
+
+    def observe(self, key: str):
+        """Record a request for key (call on hits and misses alike)"""
+        now = time.monotonic()
+        entry = self.stats.get(key)
+        if entry is None:
+            self.stats[key] = [now, None, 0.0, None, 1.0]
+            return
+
+        gap = now - entry[0]
+        entry[0] = now
+        if entry[1] is None:
+            entry[1] = gap
+        else:
+            diff = gap - entry[1]
+            entry[1] += self.alpha * diff
+            entry[2] = (1 - self.alpha) * (entry[2] + self.alpha * diff * diff)
+
+    def ttl(self, key: str, payload: bytes) -> int:
+        """TTL in seconds for a freshly fetched payload"""
+        entry = self.stats.get(key)
+        if entry is None or entry[1] is None:
+            return self.rare_ttl
+
+        # Unchanged payload since the last fetch - data is stable, keep it longer
+        payload_hash = hash(payload)
+        # (a boost beyond max_ttl / min_ttl can't change the clamped TTL)
+        entry[4] = min(entry[4] * 2, self.max_ttl / self.min_ttl) if entry[3] == payload_hash else 1.0
+        entry[3] = payload_hash
+
+        # ~p95 of the inter-arrival time, assuming roughly normal gaps
+        p95_gap = entry[1] + 1.645 * math.sqrt(entry[2])
+        if p95_gap > self.max_ttl:
+            return self.rare_ttl
+        ttl = p95_gap * self.factor * entry[4]
+        return int(min(max(ttl, self.min_ttl), self.max_ttl))
+
+# User data cache: 30s-10min depending on demand, 10s for rarely requested logins
+user_cache_ttl = AdaptiveTTL(min_ttl=30, max_ttl=600, rare_ttl=10)
+
+class CachePolicy:
+    """Cache TTL that scales with how long MT5 took to answer
+
+    ttl = clamp(elapsed * factor + buffer, min_ttl, max_ttl). When MT5 is slow
+    (under stress) results are kept longer so it gets queried less; when it
+    is fast, clients get fresher data.
+    """
+
+    def __init__(self, min_ttl: int, max_ttl: int, buffer: int, factor: float = 10.0):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.buffer = buffer
+        self.factor = factor
+
+    def ttl(self, elapsed: float) -> int:
+        """TTL in seconds for a payload that took elapsed seconds to fetch"""
+        ttl = elapsed * self.factor + self.buffer
+        return int(min(max(ttl, self.min_ttl), self.max_ttl))
+
+CACHE_POLICIES = {
+    "user": CachePolicy(min_ttl=10, max_ttl=60, buffer=1),
+    "positions": CachePolicy(min_ttl=5, max_ttl=30, buffer=2),
+}
+
+def envelope_response(
+    data: bytes,
+    fields: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Wrap already JSON-encoded data in the standard success envelope
+
+    The bytes (from the cache or straight from MT5) are spliced into the body
+    as-is, so the payload is never parsed or re-encoded.
+    """
+    if fields:
+        body = b'{"success":true,"data":' + data + b',' + orjson.dumps(fields)[1:]
+    else:
+        body = b'{"success":true,"data":' + data + b'}'
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def payload_etag(data: bytes) -> str:
+    """Weak ETag for a JSON payload (the envelope around it may differ)"""
+    return 'W/"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+
+def etag_response(
+    if_none_match: Optional[str],
+    data: bytes,
+    fields: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """envelope_response tagged with the payload's ETag
+
+    MT5 sends no ETags, so the tag is computed here; a client that already
+    holds this payload gets an empty 304 instead of the body.
+    """
+    etag = payload_etag(data)
+    headers = {**headers, "ETag": etag} if headers else {"ETag": etag}
+    if if_none_match:
+        # Weak comparison, as If-None-Match requires
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if '*' in tags or etag[2:] in tags:
+            return Response(status_code=304, headers=headers)
+    return envelope_response(data, fields, headers)
+
+# MT5 traffic is sparse, so keep idle connections well past httpx's 5s
+# default keepalive - otherwise most calls pay for a new TLS handshake
+MT5_HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=75.0
+)
+
+def create_http_transport() -> httpx.AsyncHTTPTransport:
+    """Create the MT5 connection pool
+
+    One pool is reused across all requests so TCP+TLS sessions survive
+    between calls and re-authentications. HTTP/2 is negotiated via ALPN;
+    httpx falls back to HTTP/1.1 keep-alive if the MT5 gateway does not
+    advertise h2. retries only covers opening a new connection (connect
+    errors and timeouts); a request that fails on an already pooled
+    connection, e.g. one the server has reset, is not retried.
+    """
+    return httpx.AsyncHTTPTransport(
+        verify=False,
+        http2=MT5_HTTP2,
+        retries=2,
+        limits=MT5_HTTP_LIMITS
+    )
+
+def create_http_client(transport: Optional[httpx.AsyncHTTPTransport] = None) -> httpx.AsyncClient:
+    """Create an MT5 HTTP client, on its own pool unless transport is given"""
+    return httpx.AsyncClient(
+        transport=transport or create_http_transport(),
+        base_url=MT5_API_BASE,
+        timeout=30.0,
+        headers={"Connection": "keep-alive"}
+    )
+
+@lru_cache(maxsize=64)
+def mt5_endpoint_url(endpoint: str) -> httpx.URL:
+    """Parsed MT5 API URL for endpoint, relative to the client's base_url"""
+    url = httpx.URL(endpoint.lstrip('/'))
+    # Endpoints come from callers (/api/execute) - never let them leave the MT5 API
+    if not url.is_relative_url:
+        raise HTTPException(status_code=400, detail=f"Invalid MT5 endpoint: {endpoint}")
+    return url
+
+# MT5 sessions are treated as valid for 5 minutes; the background refresher
+# re-authenticates 30 seconds before that so requests never wait on auth
+SESSION_TTL = 300
+SESSION_REFRESH_AFTER = 270
+SESSION_REFRESH_RETRY = 5
+
+# Keep-alive pings only go out once the session has been idle this long
+KEEP_ALIVE_INTERVAL = 30
+KEEP_ALIVE_IDLE = 60
 
 # MT5 Session Management with Keep-Alive
 class MT5SessionManager:
     def __init__(self):
-        self.client = None
+        # Shared client from app.state.http, attached in lifespan()
+        self.client: Optional[httpx.AsyncClient] = None
+        # Client for auth handshakes on the same pool, with a separate cookie jar
+        self.auth_client: Optional[httpx.AsyncClient] = None
         self.last_auth_time = None
-        self.auth_lock = asyncio.Lock()
+        self.last_request_time = 0.0
+        # Set whenever no authentication is running
+        self._auth_event = asyncio.Event()
+        self._auth_event.set()
+        self._auth_inflight = False
         self.keep_alive_task = None
-        self.password_hash_bytes = None
+        self.refresh_task = None
+        self.refresh_stop = asyncio.Event()
+        # Upstream fetches currently in flight, keyed by cache key
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def fetch_or_join(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fetch() at most once per cache key at a time
+
+        Concurrent cache misses for the same key await the same task instead
+        of each hitting MT5. The task is shielded so a caller disconnecting
+        doesn't cancel the fetch for everyone else.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
 
     def is_session_valid(self) -> bool:
         """Check if current session is still valid"""
-        if not self.last_auth_time or not self.client:
+        if not self.last_auth_time:
             return False
-        # Consider session valid for 5 minutes (but we'll ping every 20 seconds)
-        return (time.time() - self.last_auth_time) < 300
+        # Consider session valid for 5 minutes (kept alive by traffic or idle pings)
+        return (time.time() - self.last_auth_time) < SESSION_TTL
+
+    async def auth_refresher(self):
+        """Re-authenticate shortly before the session expires"""
+        failed = False
+        while not self.refresh_stop.is_set():
+            if failed:
+                # Last refresh failed - the old session (if any) is still in use, retry soon
+                delay = SESSION_REFRESH_RETRY
+            elif self.last_auth_time:
+                delay = max(self.last_auth_time + SESSION_REFRESH_AFTER - time.time(), 1)
+            else:
+                # No session (auth failed) - try again in a bit
+                delay = SESSION_TTL - SESSION_REFRESH_AFTER
+            failed = False
+
+            try:
+                await asyncio.wait_for(self.refresh_stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                # Someone may have re-authenticated while we slept
+                if self.last_auth_time and time.time() - self.last_auth_time < SESSION_REFRESH_AFTER:
+                    continue
+                try:
+                    failed = not await self.authenticate(force=True)
+                except Exception as e:
+                    failed = True
+                    logger.exception("Session refresh error: %s", e)
+
+    def start_refresher(self):
+        """Start the background session refresher"""
+        if not self.refresh_task:
+            self.refresh_stop.clear()
+            self.refresh_task = asyncio.create_task(self.auth_refresher())
 
     async def keep_alive_ping(self):
-        """Send keep-alive ping every 20 seconds"""
+        """Ping MT5 when the session has been idle, real traffic keeps it alive otherwise"""
         while True:
             try:
-                await asyncio.sleep(20)
-                if self.client and self.is_session_valid():
+                await asyncio.sleep(KEEP_ALIVE_INTERVAL)
+                idle = time.time() - self.last_request_time
+                if self.is_session_valid() and idle > KEEP_ALIVE_IDLE:
                     # Send ping to keep session alive
                     try:
-                        response = await self.client.get(f"{MT5_SERVER}/api/test/access")
+                        response = await self.client.get(TEST_ACCESS_URL)
                         if response.status_code == 200:
-                            print(f"Keep-alive ping successful at {datetime.now().isoformat()}")
+                            self.last_request_time = time.time()
+                            logger.debug("Keep-alive ping successful")
                         else:
-                            print(f"Keep-alive ping returned status {response.status_code}")
+                            logger.warning("Keep-alive ping returned status %s", response.status_code)
                     except Exception as e:
-                        print(f"Keep-alive ping failed: {e}")
+                        logger.warning("Keep-alive ping failed: %s", e)
                         # If ping fails, try to re-authenticate
-                        await self.authenticate()
+                        await self.authenticate(force=True)
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"Keep-alive error: {e}")
+                logger.exception("Keep-alive error: %s", e)
+
+    async def authenticate(self, force: bool = False) -> bool:
+        """Authenticate with MT5 server using persistent session
+
+        Concurrent callers share one handshake: the first runs it, the rest
+        wait on _auth_event and reuse its result.
+        """
+        if self._auth_inflight:
+            await self._auth_event.wait()
+            return self.is_session_valid()
+        if not force and self.is_session_valid():
+            return True
+
+        self._auth_inflight = True
+        self._auth_event.clear()
+        try:
+            return await self._handshake()
+        finally:
+            self._auth_inflight = False
+            self._auth_event.set()
+
+    async def _handshake(self) -> bool:
+        """Run the MT5 auth start/answer exchange"""
+        # The current session (if any) stays in use until the new one is ready
+        auth_client = self.auth_client
+        try:
+            auth_client.cookies.clear()
 
-    async def authenticate(self) -> bool:
-        """Authenticate with MT5 server using persistent session"""
-        async with self.auth_lock:
-            try:
-                # Create a new persistent client with keep-alive
-                if self.client:
-                    await self.client.aclose()
-
-                self.client = httpx.AsyncClient(
-                    verify=False,
-                    timeout=30.0,
-                    headers={"Connection": "keep-alive"}
-                )
-
-                print(f"Authenticating with MT5 server at {MT5_SERVER}")
-                auth_start_time = time.time()
-
-                # Step 1: Auth start
-                start_url = f"{MT5_SERVER}/api/auth/start"
-                params = {
-                    'version': MT5_VERSION,
-                    'agent': MT5_AGENT,
-                    'login': MT5_LOGIN,
-                    'type': 'manager'
-                }
-
-                start_resp = await self.client.get(start_url, params=params)
-                if start_resp.status_code != 200:
-                    raise Exception(f"Auth start failed: {start_resp.status_code}")
-
-                start_data = start_resp.json()
-                srv_rand = start_data.get('srv_rand')
-                if not srv_rand:
-                    raise Exception("No srv_rand in response")
-
-                # Step 2: Create auth hash (same as hash.py)
-                pwd_bytes = MT5_PASSWORD.encode('utf-16le')
-                pwd_md5 = hashlib.md5(pwd_bytes).digest()
-                self.password_hash_bytes = hashlib.md5(pwd_md5 + b'WebAPI').digest()
-                srv_rand_bytes = bytes.fromhex(srv_rand)
-                srv_rand_answer = hashlib.md5(self.password_hash_bytes + srv_rand_bytes).hexdigest()
-                cli_rand = secrets.token_hex(16)
-
-                # Check timing (must be within 10 seconds)
-                elapsed_time = time.time() - auth_start_time
-                if elapsed_time > 10:
-                    print(f"⚠️ Warning: {elapsed_time:.2f}s elapsed, may exceed 10s window")
-
-                # Step 3: Auth answer
-                answer_url = f"{MT5_SERVER}/api/auth/answer"
-                answer_params = {
-                    'srv_rand_answer': srv_rand_answer,
-                    'cli_rand': cli_rand
-                }
-
-                answer_resp = await self.client.get(answer_url, params=answer_params)
-                if answer_resp.status_code != 200:
-                    raise Exception(f"Auth answer failed: {answer_resp.status_code}")
-
-                result = answer_resp.json()
-                retcode = result.get('retcode', '')
-
-                if not retcode.startswith('0'):
-                    raise Exception(f"MT5 authentication failed: {retcode}")
-
-                # Validate server auth (mutual authentication)
-                if 'cli_rand_answer' in result:
-                    expected_cli_rand_answer = hashlib.md5(
-                        self.password_hash_bytes + bytes.fromhex(cli_rand)
-                    ).hexdigest()
-                    if result['cli_rand_answer'] != expected_cli_rand_answer:
-                        print("⚠️ Warning: Server authentication validation failed")
-
-                self.last_auth_time = time.time()
-
-                # Start keep-alive task if not already running
-                if self.keep_alive_task:
-                    self.keep_alive_task.cancel()
-                self.keep_alive_task = asyncio.create_task(self.keep_alive_ping())
-
-                # Cache authentication status
-                cache_set('mt5:auth:status', 'authenticated', 300)
-
-                print(f"✅ MT5 authentication successful in {elapsed_time:.2f}s")
-                return True
+            logger.info("Authenticating with MT5 server at %s", MT5_SERVER)
+            auth_start_time = time.time()
 
-            except Exception as e:
-                print(f"❌ Authentication error: {e}")
-                if self.client:
-                    await self.client.aclose()
-                    self.client = None
-                return False
+            # Step 1: Auth start
+            params = {
+                'version': MT5_VERSION,
+                'agent': MT5_AGENT,
+                'login': MT5_LOGIN,
+                'type': 'manager'
+            }
+
+            start_resp = await auth_client.get(AUTH_START_URL, params=params)
+            if start_resp.status_code != 200:
+                raise Exception(f"Auth start failed: {start_resp.status_code}")
+
+            start_data = orjson.loads(start_resp.content)
+            srv_rand = start_data.get('srv_rand')
+            if not srv_rand:
+                raise Exception("No srv_rand in response")
+
+            # Step 2: Create auth hash
+            srv_rand_bytes = unhexlify(srv_rand)
+            srv_rand_answer = hashlib.md5(
+                _PASSWORD_HASH + srv_rand_bytes, usedforsecurity=False
+            ).hexdigest()
+            # Keep the raw bytes for the mutual-auth check, hex only goes on the wire
+            cli_rand_bytes = os.urandom(16)
+            cli_rand = hexlify(cli_rand_bytes).decode()
+
+            # Check timing (must be within 10 seconds)
+            elapsed_time = time.time() - auth_start_time
+            if elapsed_time > 10:
+                logger.warning("⚠️ %.2fs elapsed, may exceed 10s window", elapsed_time)
+
+            # Step 3: Auth answer
+            answer_params = {
+                'srv_rand_answer': srv_rand_answer,
+                'cli_rand': cli_rand
+            }
+
+            answer_resp = await auth_client.get(AUTH_ANSWER_URL, params=answer_params)
+            if answer_resp.status_code != 200:
+                raise Exception(f"Auth answer failed: {answer_resp.status_code}")
+
+            result = orjson.loads(answer_resp.content)
+            retcode = result.get('retcode', '')
+
+            if not retcode.startswith('0'):
+                raise Exception(f"MT5 authentication failed: {retcode}")
+
+            # Validate server auth (mutual authentication)
+            if 'cli_rand_answer' in result:
+                expected_cli_rand_answer = hashlib.md5(
+                    _PASSWORD_HASH + cli_rand_bytes, usedforsecurity=False
+                ).hexdigest()
+                if result['cli_rand_answer'] != expected_cli_rand_answer:
+                    logger.warning("⚠️ Server authentication validation failed")
+
+            # Swap in the new session cookies
+            self.client.cookies.clear()
+            self.client.cookies.update(auth_client.cookies)
+            self.last_auth_time = time.time()
+            self.last_request_time = self.last_auth_time
+
+            # Start keep-alive task if not already running
+            if self.keep_alive_task:
+                self.keep_alive_task.cancel()
+            self.keep_alive_task = asyncio.create_task(self.keep_alive_ping())
+
+            # Cache authentication status
+            await cache_set('mt5:auth:status', b'authenticated', 300)
+
+            logger.info("✅ MT5 authentication successful in %.2fs", elapsed_time)
+            return True
+
+        except Exception as e:
+            # Keep the old session - if it is still valid requests carry on with it
+            logger.error("❌ Authentication error: %s", e)
+            return False
 
     async def get_client(self) -> httpx.AsyncClient:
         """Get authenticated client, create new if needed"""
@@ -342,18 +758,51 @@ class MT5SessionManager:
 
     async def execute_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute MT5 API request using persistent session"""
+        response = await self._request(endpoint, params)
+        return orjson.loads(response.content)
+
+    async def execute_request_raw(
+        self,
+        endpoint: str,
+        params: Dict[str, Any] = None,
+        validate: bool = False
+    ) -> bytes:
+        """Execute MT5 API request and return the undecoded JSON body
+
+        The body is spliced into responses unparsed, so an empty one is
+        rejected here; validate=True also checks that it parses as JSON, for
+        callers that don't decode it themselves.
+        """
+        response = await self._request(endpoint, params)
+        content = response.content
+        try:
+            if not content:
+                raise ValueError("empty body")
+            if validate:
+                orjson.loads(content)
+        except ValueError:
+            logger.error("Invalid MT5 response for %s: %r", endpoint, content[:200])
+            raise HTTPException(status_code=502, detail="Invalid response from MT5")
+        return content
+
+    async def _request(self, endpoint: str, params: Dict[str, Any] = None) -> httpx.Response:
+        """GET an MT5 API endpoint, re-authenticating once if the session expired"""
         client = await self.get_client()
-        url = f"{MT5_SERVER}/api/{endpoint.lstrip('/')}"
+        auth_time = self.last_auth_time
+        url = mt5_endpoint_url(endpoint)
 
         try:
-            response = await client.get(url, params=params or {})
+            response = await client.get(url, params=params)
             if response.status_code != 200:
                 # If unauthorized, try to re-authenticate once
                 if response.status_code in [401, 403]:
-                    print("Session expired, re-authenticating...")
-                    await self.authenticate()
+                    logger.info("Session expired, re-authenticating...")
+                    # Only invalidate the session we used - if someone already
+                    # re-authenticated, just reuse their session
+                    if self.last_auth_time == auth_time:
+                        self.last_auth_time = None
                     client = await self.get_client()
-                    response = await client.get(url, params=params or {})
+                    response = await client.get(url, params=params)
 
                 if response.status_code != 200:
                     raise HTTPException(
@@ -361,28 +810,99 @@ class MT5SessionManager:
                         detail=f"MT5 API error: {response.text}"
                     )
 
-            return response.json()
+            self.last_request_time = time.time()
+            return response
         except httpx.RequestError as e:
-            print(f"Request error: {e}")
+            logger.error("Request error: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
 
     async def close(self):
         """Clean shutdown"""
+        if self.refresh_task:
+            self.refresh_stop.set()
+            await self.refresh_task
+            self.refresh_task = None
         if self.keep_alive_task:
             self.keep_alive_task.cancel()
-        if self.client:
-            await self.client.aclose()
 
 # Global session manager
 session_manager = MT5SessionManager()
 
-# API key validation
+async def fetch_cached(
+    cache_key: str,
+    endpoint: str,
+    params: Dict[str, Any],
+    policy: CachePolicy,
+    adaptive: Optional[AdaptiveTTL] = None,
+    transform: Optional[Callable[[Any], bytes]] = None
+) -> Tuple[bytes, Optional[str]]:
+    """Cached MT5 passthrough: the MT5 body for cache_key and where it came from
+
+    The state is None for a fresh fetch, "1" for a cache hit and "stale" when
+    MT5 failed and the last known good copy is served. Concurrent misses for
+    the same key share one MT5 call. The TTL follows MT5 latency (policy),
+    raised to the demand-based TTL when adaptive is given.
+
+    transform gets the decoded MT5 body of a fresh fetch and returns the JSON
+    bytes to cache and serve instead; it may raise HTTPException to reject it.
+    """
+    cached_data = await cache_get(cache_key)
+    if cached_data:
+        return cached_data, "1"
+
+    async def fetch():
+        started = time.monotonic()
+        data = await session_manager.execute_request_raw(endpoint, params)
+        # Cached copies are served unparsed for up to STALE_TTL, so only
+        # well-formed JSON may be stored (one parse per miss, none per hit)
+        try:
+            decoded = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            logger.error("Invalid MT5 JSON for %s: %r", endpoint, data[:200])
+            raise HTTPException(status_code=502, detail="Invalid response from MT5")
+        if transform:
+            data = transform(decoded)
+        ttl = policy.ttl(time.monotonic() - started)
+        if adaptive:
+            ttl = max(adaptive.ttl(cache_key, data), ttl)
+        await cache_fill(cache_key, data, ttl)
+        return data
+
+    try:
+        return await session_manager.fetch_or_join(cache_key, fetch), None
+    except Exception as e:
+        stale_data = await cache_get_stale(cache_key, e)
+        if not stale_data:
+            raise
+        logger.warning("Serving stale %s after MT5 error: %s", cache_key, getattr(e, "detail", e))
+        return stale_data, "stale"
+
+def cached_envelope(
+    data: bytes,
+    state: Optional[str],
+    fields: Dict[str, Any],
+    etag: bool = False,
+    if_none_match: Optional[str] = None
+) -> Response:
+    """Success envelope for a fetch_cached() result, flagged with its cache state"""
+    fields = {**fields, "cached": state is not None}
+    if state == "stale":
+        fields["stale"] = True
+    headers = {"X-Cached": state} if state else None
+    if etag:
+        return etag_response(if_none_match, data, fields, headers)
+    return envelope_response(data, fields, headers)
+
+# API key validation - both values are fixed for the process lifetime
+_API_KEY_BYTES = API_KEY.encode()
+_DEV_MODE = API_KEY == 'your-secure-api-key-change-this'
+
 async def verify_api_key(x_api_key: Optional[str] = Header(None)):
     """Validate API key from header"""
-    if API_KEY == 'your-secure-api-key-change-this':
+    if _DEV_MODE:
         # Allow access without API key in development
         return True
-    if x_api_key != API_KEY:
+    if not x_api_key or not hmac.compare_digest(x_api_key.encode(), _API_KEY_BYTES):
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
     return True
 
@@ -402,18 +922,18 @@ async def health_check():
     """Health check endpoint for monitoring"""
     health_status = {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso(),
         "checks": {
             "api": "ok",
-            "redis": "ok" if REDIS_AVAILABLE else "unavailable",
+            "redis": "ok" if app.state.redis else "unavailable",
             "mt5_auth": "ok" if session_manager.is_session_valid() else "expired"
         }
     }
 
     # Test Redis if available
-    if REDIS_AVAILABLE:
+    if app.state.redis:
         try:
-            redis_client.ping()
+            await app.state.redis.ping()
         except:
             health_status["checks"]["redis"] = "error"
             health_status["status"] = "degraded"
@@ -421,15 +941,22 @@ async def health_check():
     return health_status
 
 @app.post("/api/auth")
-async def force_auth(api_key: bool = Depends(verify_api_key)):
-    """Force re-authentication with MT5 server"""
+async def force_auth(force: bool = False, api_key: bool = Depends(verify_api_key)):
+    """Authenticate with MT5 server, reusing a still valid session unless ?force=true"""
     try:
-        success = await session_manager.authenticate()
+        if not force and session_manager.is_session_valid():
+            return {
+                "success": True,
+                "message": "Session reused",
+                "timestamp": now_iso()
+            }
+
+        success = await session_manager.authenticate(force=force)
         if success:
             return {
                 "success": True,
                 "message": "Authentication successful",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         else:
             raise HTTPException(status_code=500, detail="Authentication failed")
@@ -443,44 +970,28 @@ async def get_user_details(
 ):
     """Get detailed user information by login"""
     try:
-        # Check cache first
-        cache_key = f"user:details:{login}"
-        cached_data = cache_get(cache_key)
-
-        if cached_data:
-            return {
-                "success": True,
-                "data": json.loads(cached_data),
-                "cached": True,
-                "timestamp": datetime.now().isoformat()
-            }
-
-        # Fetch from MT5
-        data = await session_manager.execute_request("user/get", {"login": str(login)})
-
-        # Check for MT5 error
-        retcode = data.get("retcode", "")
-        if retcode != "0 Done":
-            if "13" in retcode or "not found" in retcode.lower():
-                raise HTTPException(status_code=404, detail=f"User {login} not found")
-            raise HTTPException(status_code=400, detail=f"MT5 error: {retcode}")
-
-        user_data = data.get("answer", {})
-
-        # Cache for 60 seconds
-        cache_set(cache_key, json.dumps(user_data), 60)
-
-        return {
-            "success": True,
-            "data": user_data,
-            "cached": False,
-            "timestamp": datetime.now().isoformat()
-        }
+        cache_key = ck("user", "details", str(login))
+        user_cache_ttl.observe(cache_key)
+
+        def user_answer(data: Dict[str, Any]) -> bytes:
+            """Check the MT5 retcode and keep only the user record"""
+            retcode = data.get("retcode", "")
+            if retcode != "0 Done":
+                if "13" in retcode or "not found" in retcode.lower():
+                    raise HTTPException(status_code=404, detail=f"User {login} not found")
+                raise HTTPException(status_code=400, detail=f"MT5 error: {retcode}")
+            return orjson.dumps(data.get("answer", {}))
+
+        data, state = await fetch_cached(
+            cache_key, "user/get", {"login": str(login)},
+            CACHE_POLICIES["user"], adaptive=user_cache_ttl, transform=user_answer
+        )
+        return cached_envelope(data, state, {"timestamp": now_iso()})
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching user {login}: {e}")
+        logger.exception("Error fetching user %s: %s", login, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/user/update")
@@ -550,7 +1061,7 @@ async def update_user(
 
         # Execute the request
         client = await session_manager.get_client()
-        url = f"{MT5_SERVER}/api/user/update"
+        url = USER_UPDATE_URL
 
         # Send as POST with JSON body if there's a body, otherwise just params
         if body:
@@ -560,10 +1071,10 @@ async def update_user(
 
         if response.status_code != 200:
             error_msg = f"MT5 API error: {response.text}"
-            print(f"User update failed: {error_msg}")
+            logger.error("User update failed: %s", error_msg)
             raise HTTPException(status_code=response.status_code, detail=error_msg)
 
-        result = response.json()
+        result = orjson.loads(response.content)
 
         # Check for MT5 error
         retcode = result.get("retcode", "")
@@ -573,9 +1084,7 @@ async def update_user(
             raise HTTPException(status_code=400, detail=f"MT5 error: {retcode}")
 
         # Clear cache for this user
-        cache_key = f"user:details:{request.login}"
-        if cache_key in memory_cache:
-            del memory_cache[cache_key]
+        await invalidate_user(request.login)
 
         # Get updated user data
         user_data = result.get("answer", {})
@@ -584,13 +1093,13 @@ async def update_user(
             "success": True,
             "message": "User updated successfully",
             "data": user_data,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating user {request.login}: {e}")
+        logger.exception("Error updating user %s: %s", request.login, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/user/delete/{login}")
@@ -613,53 +1122,36 @@ async def delete_user(
             raise HTTPException(status_code=400, detail=f"MT5 error: {retcode}")
 
         # Clear cache for this user
-        cache_key = f"user:details:{login}"
-        if cache_key in memory_cache:
-            del memory_cache[cache_key]
+        await invalidate_user(login)
 
         return {
             "success": True,
             "message": f"User {login} deleted successfully",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting user {login}: {e}")
+        logger.exception("Error deleting user %s: %s", login, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/user/{login}")
 async def get_user(login: str, api_key: bool = Depends(verify_api_key)):
     """Get user information from MT5"""
     try:
-        # Check cache first
-        cache_key = f"user:{login}"
-        cached_data = cache_get(cache_key)
-
-        if cached_data:
-            return UserResponse(
-                success=True,
-                data=json.loads(cached_data),
-                cached=True
-            )
-
-        # Fetch from MT5
-        data = await session_manager.execute_request("user/get", {"login": login})
-
-        # Cache the result
-        cache_set(cache_key, json.dumps(data), 60)
-
-        return UserResponse(
-            success=True,
-            data=data,
-            cached=False
+        cache_key = ck("user", "login", login)
+        user_cache_ttl.observe(cache_key)
+        data, state = await fetch_cached(
+            cache_key, "user/get", {"login": login},
+            CACHE_POLICIES["user"], adaptive=user_cache_ttl
         )
+        return cached_envelope(data, state, {"error": None})
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching user {login}: {e}")
+        logger.exception("Error fetching user %s: %s", login, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/execute")
@@ -669,24 +1161,26 @@ async def execute_command(
 ):
     """Execute arbitrary MT5 API command"""
     try:
-        data = await session_manager.execute_request(request.endpoint, request.params)
+        # Pass the MT5 body through as-is instead of decoding and re-encoding it
+        data = await session_manager.execute_request_raw(request.endpoint, request.params, validate=True)
 
-        return {
-            "success": True,
-            "data": data,
-            "timestamp": datetime.now().isoformat()
-        }
+        return envelope_response(
+            data,
+            {"timestamp": now_iso()},
+            headers={"X-Proxied": "1"}
+        )
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error executing command {request.endpoint}: {e}")
+        logger.exception("Error executing command %s: %s", request.endpoint, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/positions/by-login/{login}")
 async def get_positions_by_login(
     login: str,
     symbol: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     api_key: bool = Depends(verify_api_key)
 ):
     """Get positions by login ID, optionally filtered by symbol"""
@@ -695,41 +1189,21 @@ async def get_positions_by_login(
         if symbol:
             params["symbol"] = symbol
 
-        # Check cache
-        cache_key = f"positions:login:{login}:{symbol or 'all'}"
-        cached_data = cache_get(cache_key)
-
-        if cached_data:
-            return {
-                "success": True,
-                "data": json.loads(cached_data),
-                "cached": True,
-                "timestamp": datetime.now().isoformat()
-            }
-
-        # Fetch from MT5
-        data = await session_manager.execute_request("position/get_batch", params)
-
-        # Cache for 30 seconds (positions change frequently)
-        cache_set(cache_key, json.dumps(data), 30)
-
-        return {
-            "success": True,
-            "data": data,
-            "cached": False,
-            "timestamp": datetime.now().isoformat()
-        }
+        cache_key = ck("positions", "login", login, symbol or "all")
+        data, state = await fetch_cached(cache_key, "position/get_batch", params, CACHE_POLICIES["positions"])
+        return cached_envelope(data, state, {"timestamp": now_iso()}, etag=True, if_none_match=if_none_match)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching positions for login {login}: {e}")
+        logger.exception("Error fetching positions for login %s: %s", login, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/positions/by-group/{group}")
 async def get_positions_by_group(
     group: str,
     symbol: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     api_key: bool = Depends(verify_api_key)
 ):
     """Get positions by group, optionally filtered by symbol. Supports wildcards like 'demo*' or '!demoforex'"""
@@ -738,40 +1212,20 @@ async def get_positions_by_group(
         if symbol:
             params["symbol"] = symbol
 
-        # Check cache
-        cache_key = f"positions:group:{group}:{symbol or 'all'}"
-        cached_data = cache_get(cache_key)
-
-        if cached_data:
-            return {
-                "success": True,
-                "data": json.loads(cached_data),
-                "cached": True,
-                "timestamp": datetime.now().isoformat()
-            }
-
-        # Fetch from MT5
-        data = await session_manager.execute_request("position/get_batch", params)
-
-        # Cache for 30 seconds
-        cache_set(cache_key, json.dumps(data), 30)
-
-        return {
-            "success": True,
-            "data": data,
-            "cached": False,
-            "timestamp": datetime.now().isoformat()
-        }
+        cache_key = ck("positions", "group", group, symbol or "all")
+        data, state = await fetch_cached(cache_key, "position/get_batch", params, CACHE_POLICIES["positions"])
+        return cached_envelope(data, state, {"timestamp": now_iso()}, etag=True, if_none_match=if_none_match)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching positions for group {group}: {e}")
+        logger.exception("Error fetching positions for group %s: %s", group, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/positions/by-symbol/{symbol}")
 async def get_positions_by_symbol(
     symbol: str,
+    if_none_match: Optional[str] = Header(None),
     api_key: bool = Depends(verify_api_key)
 ):
     """Get all positions for a specific symbol across all users"""
@@ -783,35 +1237,14 @@ async def get_positions_by_symbol(
             "symbol": symbol
         }
 
-        # Check cache
-        cache_key = f"positions:symbol:{symbol}"
-        cached_data = cache_get(cache_key)
-
-        if cached_data:
-            return {
-                "success": True,
-                "data": json.loads(cached_data),
-                "cached": True,
-                "timestamp": datetime.now().isoformat()
-            }
-
-        # Fetch from MT5
-        data = await session_manager.execute_request("position/get_batch", params)
-
-        # Cache for 30 seconds
-        cache_set(cache_key, json.dumps(data), 30)
-
-        return {
-            "success": True,
-            "data": data,
-            "cached": False,
-            "timestamp": datetime.now().isoformat()
-        }
+        cache_key = ck("positions", "symbol", symbol)
+        data, state = await fetch_cached(cache_key, "position/get_batch", params, CACHE_POLICIES["positions"])
+        return cached_envelope(data, state, {"timestamp": now_iso()}, etag=True, if_none_match=if_none_match)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching positions for symbol {symbol}: {e}")
+        logger.exception("Error fetching positions for symbol %s: %s", symbol, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/user/create")
@@ -900,7 +1333,7 @@ async def create_user(
 
         # Execute the request using POST with body
         client = await session_manager.get_client()
-        url = f"{MT5_SERVER}/api/user/add"
+        url = USER_ADD_URL
 
         # Send as POST with JSON body
         response = await client.post(
@@ -912,7 +1345,7 @@ async def create_user(
         if response.status_code != 200:
             # Try to parse error response
             try:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 error_msg = error_data.get("retcode", response.text)
             except:
                 error_msg = response.text
@@ -930,7 +1363,7 @@ async def create_user(
                 detail=error_msg
             )
 
-        result = response.json()
+        result = orjson.loads(response.content)
 
         # Check for MT5 error
         if result.get("retcode", "") != "0 Done":
@@ -964,13 +1397,13 @@ async def create_user(
                 },
                 "user_details": user_data
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error creating user: {e}")
+        logger.exception("Error creating user: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/test")
@@ -984,72 +1417,51 @@ async def test_endpoint(api_key: bool = Depends(verify_api_key)):
             "success": True,
             "message": "MT5 connection working",
             "test_user": data,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
     except Exception as e:
         return {
             "success": False,
             "message": "MT5 connection failed",
             "error": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
             "error": exc.detail,
             "status_code": exc.status_code,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    print(f"Unhandled error: {exc}")
-    return JSONResponse(
+    logger.error("Unhandled error: %s", exc, exc_info=exc)
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
             "error": "Internal server error",
             "status_code": 500,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
     )
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Initialize on startup"""
-    print(f"MT5 WebAPI Service starting...")
-    print(f"MT5 Server: {MT5_SERVER}")
-    print(f"MT5 Login: {MT5_LOGIN}")
-    print(f"Redis: {'Connected' if REDIS_AVAILABLE else 'Not available - using in-memory cache'}")
-
-    # Try initial authentication
-    try:
-        success = await session_manager.authenticate()
-        if success:
-            print("✅ Initial MT5 authentication successful")
-            # Test the connection
-            test_data = await session_manager.execute_request("user/get", {"login": "46108"})
-            print(f"✅ Test API call successful: User 46108 found")
-        else:
-            print("❌ Initial authentication failed (will retry on first request)")
-    except Exception as e:
-        print(f"❌ Startup authentication failed: {e}")
-        print("Will retry on first request...")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    print("Shutting down MT5 WebAPI Service...")
-    await session_manager.close()
-
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # One worker per core; each worker keeps its own MT5 session and memory
+    # cache, so use Redis to share cached data between them
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools"
+    )